@@ -3,17 +3,42 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import mmap
+import os
 import re
 import sys
 from pathlib import Path
 
-REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPT_PATH = Path(__file__).resolve()
+REPO_ROOT = SCRIPT_PATH.parents[1]
 
+# Last clean scan: "<stat key> <digest>". The digest covers this script too,
+# so editing the patterns invalidates it. Kept outside the repo: deploy-pages
+# uploads the whole checkout, and the cache file must never be published.
+CACHE_PATH = (
+    Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "nrl"
+    / "check_public_content.hash"
+)
+
+# Bytes \s is ASCII-only, so spell out the UTF-8 encodings of everything str
+# \s matches (NBSP, U+2000-U+200A, ...) to keep parity with the old check.
+_WS = (
+    rb"(?:[\s\x1c-\x1f]|\xc2[\x85\xa0]|\xe1\x9a\x80"
+    rb"|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)"
+)
+
+# Bytes patterns so the scan can run directly against an mmap of the file.
 SECRET_PATTERNS = [
-    re.compile(r"\bghp_[A-Za-z0-9]{20,}\b"),
-    re.compile(r"\bgho_[A-Za-z0-9]{20,}\b"),
-    re.compile(r"\bAKIA[0-9A-Z]{16}\b"),
-    re.compile(r"(?i)\bapi[_-]?key\s*[:=]\s*[A-Za-z0-9_\-]{8,}"),
+    re.compile(rb"\bghp_[A-Za-z0-9]{20,}\b"),
+    re.compile(rb"\bgho_[A-Za-z0-9]{20,}\b"),
+    re.compile(rb"\bAKIA[0-9A-Z]{16}\b"),
+    re.compile(
+        rb"\bapi[_-]?key" + _WS + rb"*[:=]" + _WS + rb"*[A-Za-z0-9_\-]{8,}",
+        re.IGNORECASE,
+    ),
 ]
 
 RESTRICTED_TERMS = [
@@ -25,24 +50,112 @@ RESTRICTED_TERMS = [
 ]
 
 
+def _fuse(patterns: list[re.Pattern[bytes]]) -> re.Pattern[bytes]:
+    # Global inline flags are not allowed mid-pattern, so each branch carries
+    # its own case-insensitivity as a scoped group.
+    parts = []
+    for i, p in enumerate(patterns):
+        body = b"(?i:" + p.pattern + b")" if p.flags & re.IGNORECASE else p.pattern
+        parts.append(b"(?P<p%d>" % i + body + b")")
+    return re.compile(b"|".join(parts))
+
+
+_SECRET_RE = _fuse(SECRET_PATTERNS)
+
+_RESTRICTED_RE = re.compile(
+    b"|".join(re.escape(t.encode("utf-8")) for t in RESTRICTED_TERMS), re.IGNORECASE
+)
+
+
+def scan(buf: bytes | mmap.mmap) -> list[str]:
+    errors: list[str] = []
+
+    m = _SECRET_RE.search(buf)
+    if m and m.lastgroup:
+        pattern = SECRET_PATTERNS[int(m.lastgroup[1:])]
+        shown = pattern.pattern.replace(_WS, rb"\s").decode("utf-8")
+        errors.append(f"index.html: matched secret pattern {shown}")
+
+    m = _RESTRICTED_RE.search(buf)
+    if m:
+        term = m.group(0).decode("utf-8").lower()
+        errors.append(f"index.html: matched restricted term '{term}'")
+
+    return errors
+
+
+def stat_key(*paths: Path) -> str:
+    # Paths are part of the key since the cache lives outside any one checkout.
+    parts = []
+    for path in paths:
+        st = path.stat()
+        parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+    return ",".join(parts)
+
+
+def content_digest(buf: bytes | mmap.mmap) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(SCRIPT_PATH.read_bytes())
+    h.update(buf)
+    return h.hexdigest()
+
+
+def load_cache() -> tuple[str, str]:
+    try:
+        key, _, digest = CACHE_PATH.read_text(encoding="utf-8").strip().rpartition(" ")
+    except OSError:
+        return "", ""
+    return key, digest
+
+
+def save_cache(key: str, digest: str) -> None:
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_PATH.write_text(f"{key} {digest}\n", encoding="utf-8")
+    except OSError:
+        pass  # Best-effort: a read-only checkout just rescans next time.
+
+
+def check(
+    buf: bytes | mmap.mmap, key: str, cached_digest: str
+) -> tuple[list[str], bool]:
+    digest = content_digest(buf)
+    if digest == cached_digest:
+        save_cache(key, digest)
+        return [], True
+    errors = scan(buf)
+    if not errors:
+        save_cache(key, digest)
+    return errors, False
+
+
 def main() -> int:
+    parser = argparse.ArgumentParser(description="Public content safety checks")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rescan even if index.html is unchanged since the last clean run",
+    )
+    args = parser.parse_args()
+
     index_html = REPO_ROOT / "index.html"
     if not index_html.exists():
         print("index.html is required")
         return 1
 
-    text = index_html.read_text(encoding="utf-8")
-    errors: list[str] = []
-
-    for pattern in SECRET_PATTERNS:
-        if pattern.search(text):
-            errors.append(f"index.html: matched secret pattern {pattern.pattern}")
-            break
+    key = stat_key(index_html, SCRIPT_PATH)
+    cached_key, cached_digest = ("", "") if args.no_cache else load_cache()
+    if key == cached_key:
+        print("Public content checks passed (cache hit).")
+        return 0
 
-    for term in RESTRICTED_TERMS:
-        if term in text.lower():
-            errors.append(f"index.html: matched restricted term '{term}'")
-            break
+    with index_html.open("rb") as fh:
+        if index_html.stat().st_size == 0:
+            # mmap refuses zero-length mappings; an empty page has nothing to flag.
+            errors, hit = check(b"", key, cached_digest)
+        else:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                errors, hit = check(buf, key, cached_digest)
 
     if errors:
         print("Public content checks failed:")
@@ -50,7 +163,8 @@ def main() -> int:
             print(f"- {err}")
         return 1
 
-    print("Public content checks passed.")
+    suffix = " (cache hit)" if hit else ""
+    print(f"Public content checks passed{suffix}.")
     return 0
 
 
@@ -2,6 +2,8 @@
 """Configure Cloudflare DNS records for GitHub Pages.
 
 Dry-run by default. Use --apply to make API changes.
+With --apply, zone ids are cached for 24h; use --no-cache to force a fresh
+lookup. Dry runs always look the zone up live.
 
 Required env vars:
   CLOUDFLARE_API_TOKEN
@@ -12,19 +14,41 @@ Optional:
 from __future__ import annotations
 
 import argparse
+import base64
+import functools
+import gzip
+import hashlib
+import http.client
 import json
 import os
 import sys
-import urllib.error
+import threading
+import time
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 
-API_BASE = "https://api.cloudflare.com/client/v4"
+API_HOST = "api.cloudflare.com"
+API_ROOT = "/client/v4"
 
+# One keep-alive connection per thread; http.client connections are not
+# safe to share, and fallback creates run on a small worker pool.
+_LOCAL = threading.local()
+MAX_PARALLEL_WRITES = 4
 
-@dataclass
+# Zone ids are stable for a domain's lifetime, so remember them between runs.
+ZONE_CACHE_PATH = (
+    Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "nrl"
+    / "cloudflare_zones.json"
+)
+ZONE_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+@dataclass(frozen=True)
 class DesiredRecord:
     record_type: str
     name: str
@@ -42,6 +66,22 @@ DESIRED: List[DesiredRecord] = [
 ]
 
 
+def _record_template(record: DesiredRecord) -> bytes:
+    # Everything but "name", which depends on --domain; record_json splices it in.
+    body = {
+        "type": record.record_type,
+        "content": record.content,
+        "ttl": record.ttl,
+        "proxied": record.proxied,
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+_RECORD_TEMPLATES: Dict[DesiredRecord, bytes] = {r: _record_template(r) for r in DESIRED}
+
+
+# Env is fixed for the lifetime of these one-shot scripts.
+@functools.lru_cache(maxsize=None)
 def required_env(name: str) -> str:
     val = os.getenv(name, "").strip()
     if not val:
@@ -49,29 +89,139 @@ def required_env(name: str) -> str:
     return val
 
 
+def open_connection(host: str) -> http.client.HTTPSConnection:
+    # Unlike urlopen, http.client ignores HTTPS_PROXY; honour it (and NO_PROXY)
+    # by tunnelling through the proxy with CONNECT.
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(host):
+        return http.client.HTTPSConnection(host, timeout=30)
+    parsed = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers: Dict[str, str] = {}
+    if parsed.username:
+        user = urllib.parse.unquote(parsed.username)
+        password = urllib.parse.unquote(parsed.password or "")
+        token = base64.b64encode(f"{user}:{password}".encode("utf-8")).decode("ascii")
+        headers["Proxy-Authorization"] = f"Basic {token}"
+    conn = http.client.HTTPSConnection(parsed.hostname or "", parsed.port or 80, timeout=30)
+    conn.set_tunnel(host, 443, headers=headers)
+    return conn
+
+
+def get_connection() -> http.client.HTTPSConnection:
+    conn: Optional[http.client.HTTPSConnection] = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = open_connection(API_HOST)
+        _LOCAL.conn = conn
+    return conn
+
+
+def close_connection() -> None:
+    conn: Optional[http.client.HTTPSConnection] = getattr(_LOCAL, "conn", None)
+    if conn is not None:
+        conn.close()
+        _LOCAL.conn = None
+
+
+class CloudflareAPIError(RuntimeError):
+    def __init__(self, status: int, body: str) -> None:
+        super().__init__(f"Cloudflare API error {status}: {body}")
+        self.status = status
+        self.body = body
+
+    @property
+    def rejected(self) -> bool:
+        # A 4xx whose JSON body says success=false: Cloudflare refused the request.
+        if not 400 <= self.status < 500:
+            return False
+        try:
+            return json.loads(self.body).get("success") is False
+        except (ValueError, AttributeError):
+            return False
+
+
 def cf_request(
     method: str,
     path: str,
     token: str,
-    payload: Optional[Dict[str, object]] = None,
+    payload: Union[Dict[str, object], bytes, None] = None,
 ) -> Dict[str, object]:
     data = None
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
     if payload is not None:
-        data = json.dumps(payload).encode("utf-8")
+        # Pre-serialized JSON bodies are sent as-is.
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
         headers["Content-Type"] = "application/json"
-    req = urllib.request.Request(
-        url=f"{API_BASE}{path}",
-        method=method,
-        headers=headers,
-        data=data,
-    )
+    # Only GETs are retried on a dropped keep-alive; a write may have landed.
+    attempts = 2 if method == "GET" else 1
+    for attempt in range(attempts):
+        conn = get_connection()
+        try:
+            conn.request(method, f"{API_ROOT}{path}", body=data, headers=headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+            break
+        except (http.client.HTTPException, OSError):
+            close_connection()
+            if attempt + 1 == attempts:
+                raise
+    if resp.getheader("Content-Encoding", "").lower() == "gzip":
+        raw = gzip.decompress(raw)
+    body = raw.decode("utf-8", errors="replace")
+    if resp.status >= 400:
+        raise CloudflareAPIError(resp.status, body)
+    return json.loads(body)
+
+
+def zone_cache_key(token: str, domain: str) -> str:
+    # Key on a token fingerprint too: another token/account may map the same
+    # domain to a different zone, or not see it at all.
+    fingerprint = hashlib.blake2b(token.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{domain}#{fingerprint}"
+
+
+def load_zone_cache() -> Dict[str, Dict[str, object]]:
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:  # nosec: B310
-            return json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Cloudflare API error {exc.code}: {body}") from exc
+        data = json.loads(ZONE_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_zone_cache(cache: Dict[str, Dict[str, object]]) -> None:
+    try:
+        ZONE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        ZONE_CACHE_PATH.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+    except OSError:
+        pass  # Best-effort: a read-only home just means no cache.
+
+
+def save_zone_cache(token: str, domain: str, zone_id: str, nameservers: List[str]) -> None:
+    cache = load_zone_cache()
+    cache[zone_cache_key(token, domain)] = {
+        "zone_id": zone_id,
+        "cached_at": time.time(),
+        "nameservers": nameservers,
+    }
+    write_zone_cache(cache)
+
+
+def forget_cached_zone(token: str, domain: str) -> None:
+    cache = load_zone_cache()
+    if cache.pop(zone_cache_key(token, domain), None) is not None:
+        write_zone_cache(cache)
+
+
+def cached_zone_id(token: str, domain: str) -> Optional[str]:
+    entry = load_zone_cache().get(zone_cache_key(token, domain))
+    if not isinstance(entry, dict) or not entry.get("zone_id"):
+        return None
+    try:
+        age = time.time() - float(entry.get("cached_at", 0))
+    except (TypeError, ValueError):
+        return None
+    if age >= ZONE_CACHE_TTL_SECONDS:
+        return None
+    return str(entry["zone_id"])
 
 
 def get_zone_id(token: str, domain: str) -> Optional[str]:
@@ -80,7 +230,29 @@ def get_zone_id(token: str, domain: str) -> Optional[str]:
     result = data.get("result", [])
     if not result:
         return None
-    return str(result[0]["id"])
+    zone = result[0]
+    zone_id = str(zone["id"])
+    nameservers = [str(n) for n in zone.get("name_servers", [])]
+    save_zone_cache(token, domain, zone_id, nameservers)
+    return zone_id
+
+
+def load_cached_zone(
+    token: str, domain: str
+) -> Tuple[Optional[str], Optional[List[Dict[str, object]]]]:
+    zone_id = cached_zone_id(token, domain)
+    if zone_id is None:
+        return None, None
+    # Listing the records is the first zone call anyway; it doubles as a check
+    # that the cached id is still valid for this token.
+    try:
+        return zone_id, list_records(token, zone_id)
+    except CloudflareAPIError as exc:
+        if exc.status not in (403, 404):
+            raise
+        print(f"Cached zone id {zone_id} rejected ({exc.status}); looking it up again.")
+    forget_cached_zone(token, domain)
+    return None, None
 
 
 def create_zone(token: str, domain: str, account_id: str) -> Tuple[str, List[str]]:
@@ -104,37 +276,114 @@ def fqdn_for(label: str, domain: str) -> str:
     return domain if label == "@" else f"{label}.{domain}"
 
 
-def find_record(
-    records: List[Dict[str, object]],
-    record_type: str,
-    fqdn: str,
-    content: str,
-) -> Optional[Dict[str, object]]:
+PlannedRecord = Tuple[DesiredRecord, str]
+
+
+def build_plan(domain: str) -> List[PlannedRecord]:
+    return [(r, fqdn_for(r.name, domain)) for r in DESIRED]
+
+
+def describe(record: DesiredRecord, fqdn: str) -> str:
+    return f"{record.record_type} {fqdn} -> {record.content}"
+
+
+RecordKey = Tuple[str, str, str]
+
+
+def record_key(record_type: str, fqdn: str, content: str) -> RecordKey:
+    return (record_type, fqdn, content.rstrip("."))
+
+
+def index_records(records: List[Dict[str, object]]) -> Dict[RecordKey, Dict[str, object]]:
+    index: Dict[RecordKey, Dict[str, object]] = {}
     for rec in records:
-        if (
-            rec.get("type") == record_type
-            and rec.get("name") == fqdn
-            and str(rec.get("content", "")).rstrip(".") == content.rstrip(".")
-        ):
-            return rec
-    return None
-
-
-def upsert_record(token: str, zone_id: str, record: DesiredRecord, domain: str) -> str:
-    fqdn = fqdn_for(record.name, domain)
-    existing = list_records(token, zone_id)
-    match = find_record(existing, record.record_type, fqdn, record.content)
-    if match:
-        return f"exists: {record.record_type} {fqdn} -> {record.content}"
-    payload = {
-        "type": record.record_type,
-        "name": fqdn,
-        "content": record.content,
-        "ttl": record.ttl,
-        "proxied": record.proxied,
-    }
-    cf_request("POST", f"/zones/{zone_id}/dns_records", token, payload)
-    return f"created: {record.record_type} {fqdn} -> {record.content}"
+        key = record_key(
+            str(rec.get("type", "")),
+            str(rec.get("name", "")),
+            str(rec.get("content", "")),
+        )
+        index[key] = rec
+    return index
+
+
+def record_json(record: DesiredRecord, fqdn: str) -> bytes:
+    template = _RECORD_TEMPLATES.get(record) or _record_template(record)
+    # Templates are JSON objects; open one up and prepend the name field.
+    return b'{"name": ' + json.dumps(fqdn).encode("utf-8") + b", " + template[1:]
+
+
+def create_record(token: str, zone_id: str, record: DesiredRecord, fqdn: str) -> str:
+    cf_request("POST", f"/zones/{zone_id}/dns_records", token, record_json(record, fqdn))
+    return f"created: {describe(record, fqdn)}"
+
+
+def create_record_in_worker(
+    token: str, zone_id: str, record: DesiredRecord, fqdn: str
+) -> str:
+    try:
+        return create_record(token, zone_id, record, fqdn)
+    finally:
+        # Pool threads are discarded after the fallback; don't leak their sockets.
+        close_connection()
+
+
+def create_records_individually(
+    token: str, zone_id: str, to_create: List[PlannedRecord]
+) -> List[str]:
+    workers = min(len(to_create), MAX_PARALLEL_WRITES)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [
+            ex.submit(create_record_in_worker, token, zone_id, r, fqdn)
+            for r, fqdn in to_create
+        ]
+    messages: List[str] = []
+    failed = 0
+    for (r, fqdn), fut in zip(to_create, futures):
+        try:
+            messages.append(fut.result())
+        except Exception as exc:
+            failed += 1
+            messages.append(f"failed: {describe(r, fqdn)} ({exc})")
+    if failed:
+        # Show what did land before failing, so the operator knows the state.
+        for msg in messages:
+            print(msg)
+        raise RuntimeError(f"{failed} of {len(to_create)} record creates failed")
+    return messages
+
+
+def batch_unavailable(exc: CloudflareAPIError) -> bool:
+    # 404/405 mean no batch endpoint. Auth failures and rate limits would hit
+    # every per-record POST too, and on a 5xx we can't tell whether the batch
+    # was applied, so those are re-raised.
+    if exc.status in (404, 405):
+        return True
+    if exc.status in (401, 403, 429):
+        return False
+    return exc.rejected
+
+
+def batch_upsert(
+    token: str,
+    zone_id: str,
+    to_create: List[PlannedRecord],
+) -> List[str]:
+    if not to_create:
+        return []
+    posts = b", ".join(record_json(r, fqdn) for r, fqdn in to_create)
+    payload = b'{"posts": [' + posts + b"]}"
+    try:
+        data = cf_request("POST", f"/zones/{zone_id}/dns_records/batch", token, payload)
+    except CloudflareAPIError as exc:
+        if not batch_unavailable(exc):
+            raise
+        # A batch that was not found or was rejected was not applied;
+        # fall back to one POST per record.
+        print(f"Batch endpoint unavailable ({exc}); creating records individually.")
+        return create_records_individually(token, zone_id, to_create)
+    if not data.get("success"):
+        raise RuntimeError(f"Batch create failed: {data.get('errors', [])}")
+    return [f"created: {describe(r, fqdn)}" for r, fqdn in to_create]
 
 
 def main() -> int:
@@ -146,7 +395,13 @@ def main() -> int:
         action="store_true",
         help="Create zone if missing (requires CLOUDFLARE_ACCOUNT_ID)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"With --apply, ignore the cached zone id in {ZONE_CACHE_PATH}",
+    )
     args = parser.parse_args()
+    plan = build_plan(args.domain)
 
     token = os.getenv("CLOUDFLARE_API_TOKEN", "").strip()
     if not token:
@@ -154,13 +409,19 @@ def main() -> int:
             print("Missing required environment variable: CLOUDFLARE_API_TOKEN")
             return 2
         print("No CLOUDFLARE_API_TOKEN found; dry-run plan only.")
-        for r in DESIRED:
-            print(f"would upsert: {r.record_type} {fqdn_for(r.name, args.domain)} -> {r.content}")
+        for r, fqdn in plan:
+            print(f"would upsert: {describe(r, fqdn)}")
         if args.create_zone:
             print("would create zone if missing (requires CLOUDFLARE_ACCOUNT_ID + API token).")
         return 0
 
-    zone_id = get_zone_id(token, args.domain)
+    # Dry runs skip the cache so they still prove the token can see the zone.
+    zone_id: Optional[str] = None
+    existing: Optional[List[Dict[str, object]]] = None
+    if args.apply and not args.no_cache:
+        zone_id, existing = load_cached_zone(token, args.domain)
+    if zone_id is None:
+        zone_id = get_zone_id(token, args.domain)
     nameservers: List[str] = []
     if zone_id is None:
         print(f"Zone not found for {args.domain}.")
@@ -176,6 +437,7 @@ def main() -> int:
             print("Dry-run: would create zone.")
             return 0
         zone_id, nameservers = create_zone(token, args.domain, account_id)
+        save_zone_cache(token, args.domain, zone_id, nameservers)
         print(f"Zone created: {zone_id}")
         if nameservers:
             print("Assigned nameservers:")
@@ -186,12 +448,21 @@ def main() -> int:
 
     if not args.apply:
         print(f"Dry-run: zone {zone_id}")
-        for r in DESIRED:
-            print(f"would upsert: {r.record_type} {fqdn_for(r.name, args.domain)} -> {r.content}")
+        for r, fqdn in plan:
+            print(f"would upsert: {describe(r, fqdn)}")
         return 0
 
-    for r in DESIRED:
-        msg = upsert_record(token, zone_id, r, args.domain)
+    if existing is None:
+        existing = list_records(token, zone_id)
+    existing_index = index_records(existing)
+    to_create: List[PlannedRecord] = []
+    for r, fqdn in plan:
+        if record_key(r.record_type, fqdn, r.content) in existing_index:
+            print(f"exists: {describe(r, fqdn)}")
+        else:
+            to_create.append((r, fqdn))
+
+    for msg in batch_upsert(token, zone_id, to_create):
         print(msg)
 
     print("Cloudflare DNS parity ensured.")
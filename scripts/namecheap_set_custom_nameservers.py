@@ -12,15 +12,28 @@ Required env vars:
 from __future__ import annotations
 
 import argparse
+import base64
+import functools
+import gzip
+import http.client
 import os
 import sys
 import urllib.parse
 import urllib.request
-from typing import Dict, List, Tuple
+import xml.etree.ElementTree as ET  # nosec: B405 - trusted Namecheap API responses
+from dataclasses import dataclass
+from typing import IO, Dict, List, Optional, Tuple
 
-NAMECHEAP_API = "https://api.namecheap.com/xml.response"
+NAMECHEAP_HOST = "api.namecheap.com"
+NAMECHEAP_PATH = "/xml.response"
+NAMECHEAP_NS = "{http://api.namecheap.com/xml.response}"
 
+# Reused across call_namecheap invocations to avoid a TLS handshake per call.
+_CONN: Optional[http.client.HTTPSConnection] = None
 
+
+# Env is fixed for the lifetime of these one-shot scripts.
+@functools.lru_cache(maxsize=None)
 def required_env(name: str) -> str:
     value = os.getenv(name, "").strip()
     if not value:
@@ -49,11 +62,88 @@ def build_query(sld: str, tld: str, nameservers: List[str]) -> Dict[str, str]:
     return params
 
 
-def call_namecheap(params: Dict[str, str]) -> str:
+def open_connection(host: str) -> http.client.HTTPSConnection:
+    # Unlike urlopen, http.client ignores HTTPS_PROXY; honour it (and NO_PROXY)
+    # by tunnelling through the proxy with CONNECT.
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(host):
+        return http.client.HTTPSConnection(host, timeout=30)
+    parsed = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers: Dict[str, str] = {}
+    if parsed.username:
+        user = urllib.parse.unquote(parsed.username)
+        password = urllib.parse.unquote(parsed.password or "")
+        token = base64.b64encode(f"{user}:{password}".encode("utf-8")).decode("ascii")
+        headers["Proxy-Authorization"] = f"Basic {token}"
+    conn = http.client.HTTPSConnection(parsed.hostname or "", parsed.port or 80, timeout=30)
+    conn.set_tunnel(host, 443, headers=headers)
+    return conn
+
+
+def get_connection() -> http.client.HTTPSConnection:
+    global _CONN
+    if _CONN is None:
+        _CONN = open_connection(NAMECHEAP_HOST)
+    return _CONN
+
+
+def close_connection() -> None:
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
+
+
+@dataclass
+class NamecheapResult:
+    status: str
+    errors: List[str]
+    results: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "OK"
+
+
+def parse_response(stream: IO[bytes]) -> NamecheapResult:
+    # Stream the XML so large responses are never held whole in memory.
+    status = ""
+    errors: List[str] = []
+    results: List[str] = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == f"{NAMECHEAP_NS}ApiResponse":
+                status = elem.get("Status", "")
+            continue
+        if elem.tag == f"{NAMECHEAP_NS}Error":
+            errors.append(f"{elem.get('Number', '?')}: {(elem.text or '').strip()}")
+            elem.clear()
+        elif elem.tag == f"{NAMECHEAP_NS}CommandResponse":
+            for child in elem:
+                attrs = " ".join(f"{k}={v}" for k, v in child.attrib.items())
+                results.append(f"{child.tag.rsplit('}', 1)[-1]} {attrs}".strip())
+            elem.clear()
+    return NamecheapResult(status, errors, results)
+
+
+def call_namecheap(params: Dict[str, str]) -> NamecheapResult:
     query = urllib.parse.urlencode(params)
-    url = f"{NAMECHEAP_API}?{query}"
-    with urllib.request.urlopen(url, timeout=30) as response:  # nosec: B310
-        return response.read().decode("utf-8")
+    conn = get_connection()
+    try:
+        conn.request("GET", f"{NAMECHEAP_PATH}?{query}", headers={"Accept-Encoding": "gzip"})
+        response = conn.getresponse()
+        gzipped = response.getheader("Content-Encoding", "").lower() == "gzip"
+        if response.status >= 400:
+            raw = response.read()
+            body = (gzip.decompress(raw) if gzipped else raw).decode("utf-8", "replace")
+            raise RuntimeError(f"Namecheap API error {response.status}: {body}")
+        stream: IO[bytes] = gzip.GzipFile(fileobj=response) if gzipped else response
+        result = parse_response(stream)
+        response.read()  # Drain anything after the root so the connection is reusable.
+    except (http.client.HTTPException, OSError, ET.ParseError):
+        close_connection()
+        raise
+    return result
 
 
 def main() -> int:
@@ -85,8 +175,13 @@ def main() -> int:
         print(f"Namecheap API call failed: {exc}")
         return 1
 
-    print("Namecheap API response (first 500 chars):")
-    print(result[:500])
+    print(f"Namecheap API status: {result.status or '(missing)'}")
+    for line in result.results:
+        print(f"- {line}")
+    if not result.ok:
+        for err in result.errors:
+            print(f"error: {err}")
+        return 1
     return 0
 
 
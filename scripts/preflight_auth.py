@@ -8,10 +8,12 @@ Use --strict to fail when required providers are not ready.
 from __future__ import annotations
 
 import argparse
+import functools
 import os
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Dict, List
 
@@ -27,6 +29,8 @@ def run(cmd: List[str]) -> subprocess.CompletedProcess[str]:
     return subprocess.run(cmd, text=True, capture_output=True, check=False)
 
 
+# PATH does not change mid-run; resolve each tool at most once.
+@functools.lru_cache(maxsize=None)
 def has_cmd(name: str) -> bool:
     return shutil.which(name) is not None
 
@@ -71,11 +75,17 @@ def check_gcloud() -> CheckResult:
         )
 
     # Accept either active user auth or explicit workload/service account env wiring.
-    active = run(
-        ["gcloud", "auth", "list", "--filter=status:ACTIVE", "--format=value(account)"]
-    )
-    account = (active.stdout or "").strip()
-    project = run(["gcloud", "config", "get-value", "project"]).stdout.strip()
+    # `auth list` only reports an account that actually has credentials; the
+    # core/account property (as shown by `gcloud info`) can be set without any.
+    # The two gcloud cold starts are independent, so overlap them.
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        active = ex.submit(
+            run,
+            ["gcloud", "auth", "list", "--filter=status:ACTIVE", "--format=value(account)"],
+        )
+        configured = ex.submit(run, ["gcloud", "config", "get-value", "project"])
+    account = (active.result().stdout or "").strip()
+    project = (configured.result().stdout or "").strip()
 
     wid = os.getenv("GCP_WORKLOAD_IDENTITY_PROVIDER", "").strip()
     sa = os.getenv("GCP_SERVICE_ACCOUNT", "").strip()
@@ -154,9 +164,10 @@ def main() -> int:
     args = parser.parse_args()
 
     required = set(args.require)
-    results: Dict[str, CheckResult] = {}
-    for name, fn in CHECKERS.items():
-        results[name] = fn()
+    # Checkers only wait on subprocesses and env lookups, so run them together.
+    with ThreadPoolExecutor(max_workers=len(CHECKERS)) as ex:
+        futures = {name: ex.submit(fn) for name, fn in CHECKERS.items()}
+        results: Dict[str, CheckResult] = {n: f.result() for n, f in futures.items()}
 
     print(f"preflight context: {args.context}")
     for name in ["github", "cloudflare", "gcloud", "namecheap"]:
@@ -4,16 +4,27 @@
 from __future__ import annotations
 
 import argparse
+import re
 import subprocess
 import sys
-from typing import List
-
-EXPECTED_A = {
-    "185.199.108.153",
-    "185.199.109.153",
-    "185.199.110.153",
-    "185.199.111.153",
-}
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+EXPECTED_A = frozenset(
+    {
+        "185.199.108.153",
+        "185.199.109.153",
+        "185.199.110.153",
+        "185.199.111.153",
+    }
+)
+
+# Have curl emit only the fields that betray forwarding/parking, one per line.
+# %header{} needs curl >= 7.84.
+HEADER_PROBE_FORMAT = (
+    "%{http_code}\n%header{server}\n%header{x-served-by}\n%header{location}\n"
+)
+_PARKING_RE = re.compile(r"(?i)Namecheap URL Forward|parking")
 
 
 def run(cmd: List[str]) -> str:
@@ -21,6 +32,19 @@ def run(cmd: List[str]) -> str:
     return out
 
 
+def answers_by_type(answer: str) -> Dict[str, Dict[str, List[str]]]:
+    # Group `dig +noall +answer` lines as {owner: {type: [rdata, ...]}}.
+    grouped: Dict[str, Dict[str, List[str]]] = {}
+    for line in answer.splitlines():
+        fields = line.split(None, 4)
+        if len(fields) < 5 or line.startswith(";"):
+            continue
+        owner, _ttl, _cls, rtype, rdata = fields
+        by_type = grouped.setdefault(owner.rstrip(".").lower(), {})
+        by_type.setdefault(rtype, []).append(rdata)
+    return grouped
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Verify DNS cutover for GitHub Pages.")
     parser.add_argument("--domain", default="northrootlabs.com")
@@ -29,10 +53,20 @@ def main() -> int:
     domain = args.domain
     www = f"www.{domain}"
 
-    ns = sorted([x for x in run(["dig", "+short", "NS", domain]).splitlines() if x])
-    a_records = sorted([x for x in run(["dig", "+short", "A", domain]).splitlines() if x])
-    www_cname = run(["dig", "+short", "CNAME", www])
-    headers = run(["curl", "-sI", f"http://{domain}/"])
+    # One dig process carries all three queries (ANY is often refused per
+    # RFC 8482); the HTTP probe runs alongside it.
+    dig_cmd = ["dig", "+noall", "+answer", domain, "NS", domain, "A", www, "CNAME"]
+    curl_cmd = ["curl", "-sI", "-o", "/dev/null", "-w", HEADER_PROBE_FORMAT]
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        dig_future = ex.submit(run, dig_cmd)
+        headers_future = ex.submit(run, curl_cmd + [f"http://{domain}/"])
+
+    answers = answers_by_type(dig_future.result())
+    apex = answers.get(domain.lower(), {})
+    ns = sorted(apex.get("NS", []))
+    a_records = sorted(apex.get("A", []))
+    www_cname = "\n".join(answers.get(www.lower(), {}).get("CNAME", []))
+    headers = headers_future.result()
 
     ok = True
     print("NS:")
@@ -43,7 +77,7 @@ def main() -> int:
         print(f"- {x}")
     print(f"CNAME www: {www_cname or '(none)'}")
 
-    if not set(a_records).intersection(EXPECTED_A):
+    if EXPECTED_A.isdisjoint(a_records):
         print("FAIL: apex A records do not include GitHub Pages IPs")
         ok = False
 
@@ -51,8 +85,12 @@ def main() -> int:
         print("FAIL: www CNAME is not pointing to northroot-labs.github.io")
         ok = False
 
-    if "Namecheap URL Forward" in headers or "parking" in headers.lower():
-        print("FAIL: domain still appears to use Namecheap forwarding/parking")
+    parked = _PARKING_RE.search(headers)
+    if parked:
+        print(
+            "FAIL: domain still appears to use Namecheap forwarding/parking "
+            f"(matched {parked.group(0)!r} in response headers)"
+        )
         ok = False
 
     if ok: